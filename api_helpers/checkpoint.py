@@ -0,0 +1,136 @@
+import asyncio
+import json
+import os
+import time
+from typing import Any, Dict, List, Optional, Set
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+checkpoint_dir = os.getenv("CHECKPOINT_DIR", "")
+checkpoint_interval = float(os.getenv("CHECKPOINT_INTERVAL_SECONDS", 30))
+
+
+class CrawlCheckpoint:
+    """
+    Persist the progress of a crawl to disk so it can be resumed.
+
+    The checkpoint is an append-only JSON lines log of records, e.g; fetched
+    pages and details. Each save appends only the records queued since the
+    previous one, on a worker thread, so its cost does not grow with the crawl.
+    """
+
+    # Checkpoint files owned by a running crawl of this process
+    _active: Set[str] = set()
+
+    def __init__(self, path: str, interval: float = checkpoint_interval):
+        """
+        Initialize the checkpoint.
+        :param path: File to store the checkpoint in.
+        :param interval: Minimum number of seconds between periodic saves.
+        """
+        self.path = path
+        self.interval = interval
+        self._queued: List[Dict[str, Any]] = []
+        self._last_save = time.monotonic()
+        self._lock: Optional[asyncio.Lock] = None
+
+    @classmethod
+    def for_crawl(cls, key: str) -> Optional["CrawlCheckpoint"]:
+        """
+        Claim the checkpoint of a crawl, release it once the crawl is over.
+        Only one crawl of the process owns a checkpoint at a time.
+        :param key: Crawl key, e.g; source and selection, see CharacterAPI.
+        :return: Checkpoint, None if checkpointing is disabled or the
+            checkpoint is owned by another running crawl.
+        """
+        if not checkpoint_dir:
+            return None
+
+        path = os.path.join(checkpoint_dir, f"{key}.jsonl")
+        if path in cls._active:
+            return None
+        cls._active.add(path)
+        return cls(path)
+
+    def release(self) -> None:
+        """
+        Release the checkpoint, another crawl may claim it afterwards.
+        """
+        self._active.discard(self.path)
+
+    def append(self, record: Dict[str, Any]) -> None:
+        """
+        Queue a record for the next save.
+        :param record: JSON serializable record, must not be mutated afterwards.
+        """
+        self._queued.append(record)
+
+    def load(self) -> List[Dict[str, Any]]:
+        """
+        Load the saved records.
+        A line cut by an interrupted write ends the log, it is truncated there
+        so the next records start on a clean line.
+        :return: Records in the order they were appended.
+        """
+        records = []
+        offset = 0
+        try:
+            with open(self.path, "rb+") as file:
+                for line in file:
+                    try:
+                        record = json.loads(line) if line.endswith(b"\n") else None
+                    except ValueError:
+                        record = None
+                    if not isinstance(record, dict):
+                        file.truncate(offset)
+                        break
+                    offset += len(line)
+                    records.append(record)
+        except FileNotFoundError:
+            return []
+        except OSError as e:
+            print(f"Ignoring unreadable checkpoint {self.path}: {str(e)}")
+            return []
+        return records
+
+    async def save(self) -> None:
+        """
+        Append the queued records to the log off the event loop.
+        """
+        records, self._queued = self._queued, []
+        self._last_save = time.monotonic()
+        if not records:
+            return
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            loop = asyncio.get_running_loop()
+            await loop.run_in_executor(None, self._write, records)
+
+    def _write(self, records: List[Dict[str, Any]]) -> None:
+        """
+        Append records to the checkpoint file.
+        :param records: Records to append.
+        """
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        with open(self.path, "a") as file:
+            file.writelines(f"{json.dumps(record)}\n" for record in records)
+
+    async def maybe_save(self) -> None:
+        """
+        Append the queued records if the interval has elapsed since the last save.
+        """
+        if time.monotonic() - self._last_save >= self.interval:
+            await self.save()
+
+    def clear(self) -> None:
+        """
+        Remove the checkpoint once the crawl is complete.
+        """
+        self._queued = []
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
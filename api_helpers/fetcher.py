@@ -1,6 +1,6 @@
 import asyncio
 import os
-from typing import Any, Dict, List, Union
+from typing import Any, Dict, List, Optional, Set, Union
 from urllib.parse import urlparse
 
 import aiohttp
@@ -8,6 +8,9 @@ from async_lru import alru_cache
 from dotenv import load_dotenv
 from tenacity import retry, stop_after_attempt, wait_exponential
 
+from api_helpers.checkpoint import CrawlCheckpoint
+from api_helpers.scheduler import Priority, PriorityScheduler, get_scheduler, scheduling
+
 load_dotenv()
 
 stop_after = int(os.getenv("TENACITY_MIN_BACKOFF", 5))
@@ -35,7 +38,17 @@ class Fetcher:
         Initialize the Fetcher with a rate limit.
         :param rate_limit: Maximum number of concurrent requests.
         """
-        self.semaphore = asyncio.Semaphore(rate_limit)
+        self.rate_limit = rate_limit
+
+    def scheduler(self, url: str) -> PriorityScheduler:
+        """
+        Get the scheduler of the URL host.
+        Requests to a host run by priority once its rate limit is saturated,
+        across every fetcher and request of the process.
+        :param url: The URL to fetch.
+        :return: Shared scheduler of the host.
+        """
+        return get_scheduler(urlparse(url).netloc, self.rate_limit)
 
     @retry(
         stop=stop_after_attempt(stop_after),
@@ -51,7 +64,7 @@ class Fetcher:
         if not url and not is_data_url(url):
             return {}
 
-        async with self.semaphore:
+        async with self.scheduler(url):
             async with aiohttp.ClientSession() as session:
                 try:
                     print(f"Fetching data from {url}")
@@ -80,6 +93,7 @@ class GraphFetcher(Fetcher):
         """
         self.visited_urls: set[str] = set()
         self.details_dict: Dict[str, Any] = {}
+        self.checkpoint: Optional[CrawlCheckpoint] = None
         # Control recursive fetching, TOO much data can be fetched
         self.enable_recursive_fetch = enable_recursive_fetch
         super().__init__(rate_limit)
@@ -106,10 +120,18 @@ class GraphFetcher(Fetcher):
 
             try:
                 self.visited_urls.add(node)
-                fetched_data = await self.safe_fetch_single(node)
-                self.details_dict[node] = fetched_data
+                if node in self.details_dict:
+                    # Restored from a checkpoint, only walk it again
+                    fetched_data = self.details_dict[node]
+                else:
+                    fetched_data = await self.safe_fetch_single(node)
+                    self.details_dict[node] = fetched_data
+                    if self.checkpoint is not None:
+                        self.checkpoint.append({"detail": node, "data": fetched_data})
+                        await self.checkpoint.maybe_save()
                 if self.enable_recursive_fetch:
-                    await self.traverse_and_fetch(fetched_data, base_field=node)
+                    with scheduling(priority=Priority.ENRICHMENT):
+                        await self.traverse_and_fetch(fetched_data, base_field=node)
 
             except Exception as e:
                 print(f"Error fetching data for {node}: {str(e)}")
@@ -123,12 +145,30 @@ class GraphFetcher(Fetcher):
             for key, value in node.items():
                 await self.traverse_and_fetch(value, base_field=key)
 
-    async def fetch_graph(self, raw_data: List[Dict[str, Any]]) -> Dict[str, Any]:
+    async def fetch_graph(
+        self, raw_data: List[Dict[str, Any]], detail_keys: Optional[Set[str]] = None
+    ) -> Dict[str, Any]:
         """
         Traverse and fetch all data starting from raw_data.
         :param raw_data: Raw input data.
+        :param detail_keys: Keys of the raw items whose links are needed for the
+            normalized output, the other links are fetched as optional
+            enrichment. None to fetch every link as a detail.
         :return: Dictionary of fetched details.
         """
-        tasks = [self.traverse_and_fetch(item) for item in raw_data]
+        tasks = []
+        for item in raw_data:
+            detail, optional = item, None
+            if detail_keys is not None and isinstance(item, dict):
+                detail = {k: v for k, v in item.items() if k in detail_keys}
+                optional = {k: v for k, v in item.items() if k not in detail_keys}
+            # Tasks inherit the scheduling context they are created in
+            with scheduling(priority=Priority.DETAIL):
+                tasks.append(asyncio.ensure_future(self.traverse_and_fetch(detail)))
+            if optional:
+                with scheduling(priority=Priority.ENRICHMENT):
+                    tasks.append(
+                        asyncio.ensure_future(self.traverse_and_fetch(optional))
+                    )
         await asyncio.gather(*tasks)
         return self.details_dict
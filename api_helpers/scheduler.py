@@ -0,0 +1,162 @@
+import asyncio
+import heapq
+import itertools
+import os
+import weakref
+from contextlib import contextmanager
+from contextvars import ContextVar
+from enum import IntEnum
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+aging_seconds = float(os.getenv("SCHEDULER_AGING_SECONDS", 2))
+
+
+class Priority(IntEnum):
+    """
+    Importance of a request, lower values are served first.
+    """
+
+    PAGE = 0  # Pagination requests, they gate the whole response
+    DETAIL = 1  # Detail fetches needed for the normalized output
+    ENRICHMENT = 2  # Optional or recursive enrichment
+
+
+class RequestClass(IntEnum):
+    """
+    Origin of a request, interactive work preempts background work.
+    """
+
+    INTERACTIVE = 0
+    BACKGROUND = 1
+
+
+current_priority: ContextVar[Priority] = ContextVar(
+    "current_priority", default=Priority.DETAIL
+)
+current_request_class: ContextVar[RequestClass] = ContextVar(
+    "current_request_class", default=RequestClass.INTERACTIVE
+)
+
+
+@contextmanager
+def scheduling(
+    priority: Optional[Priority] = None, request_class: Optional[RequestClass] = None
+) -> Iterator[None]:
+    """
+    Set the priority and/or request class for requests made inside the block.
+    Tasks spawned inside the block (e.g; asyncio.gather) inherit the values.
+    :param priority: Priority of the requests.
+    :param request_class: Request class of the requests.
+    """
+    priority_token = current_priority.set(priority) if priority is not None else None
+    class_token = (
+        current_request_class.set(request_class) if request_class is not None else None
+    )
+    try:
+        yield
+    finally:
+        if class_token is not None:
+            current_request_class.reset(class_token)
+        if priority_token is not None:
+            current_priority.reset(priority_token)
+
+
+class PriorityScheduler:
+    """
+    Concurrency limiter that hands free slots to the most important waiter.
+
+    Waiters are ordered by a virtual deadline: enqueue time plus one aging
+    window per level, so lower-priority work is delayed but never starved.
+    """
+
+    def __init__(self, limit: int, aging: float = aging_seconds):
+        """
+        Initialize the scheduler.
+        :param limit: Maximum number of concurrent holders.
+        :param aging: Seconds of waiting that outweigh one priority level.
+        """
+        self.limit = limit
+        self.aging = aging
+        self._active = 0
+        self._waiters: List[Tuple[float, int, asyncio.Future]] = []
+        self._counter = itertools.count()
+
+    @staticmethod
+    def level(priority: Priority, request_class: RequestClass) -> int:
+        """
+        Combine priority and request class into a single level.
+        The request class dominates, interactive pages come first.
+        """
+        return request_class * len(Priority) + priority
+
+    async def acquire(
+        self,
+        priority: Optional[Priority] = None,
+        request_class: Optional[RequestClass] = None,
+    ) -> None:
+        """
+        Wait for a free slot.
+        :param priority: Priority of the request, defaults to the context value.
+        :param request_class: Request class, defaults to the context value.
+        """
+        if self._active < self.limit and not self._waiters:
+            self._active += 1
+            return
+
+        priority = current_priority.get() if priority is None else priority
+        request_class = (
+            current_request_class.get() if request_class is None else request_class
+        )
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        deadline = loop.time() + self.level(priority, request_class) * self.aging
+        heapq.heappush(self._waiters, (deadline, next(self._counter), future))
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # The slot was handed over just before cancellation, pass it on
+                self.release()
+            raise
+
+    def release(self) -> None:
+        """
+        Release a slot, handing it directly to the next waiter if any.
+        """
+        while self._waiters:
+            _, _, future = heapq.heappop(self._waiters)
+            if not future.done():
+                future.set_result(None)
+                return
+        self._active -= 1
+
+    async def __aenter__(self) -> None:
+        await self.acquire()
+
+    async def __aexit__(self, *exc_info: Any) -> None:
+        self.release()
+
+
+# Schedulers shared by every fetcher of an upstream host, per event loop
+HostSchedulers = Dict[str, PriorityScheduler]
+_schedulers: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, HostSchedulers]" = (
+    weakref.WeakKeyDictionary()
+)
+
+
+def get_scheduler(host: str, limit: int) -> PriorityScheduler:
+    """
+    Get the scheduler of an upstream host, shared across requests so their
+    work competes in one queue. The first caller sets the limit.
+    :param host: Upstream host, e.g; "swapi.dev".
+    :param limit: Maximum number of concurrent requests to the host.
+    :return: Shared scheduler.
+    """
+    schedulers = _schedulers.setdefault(asyncio.get_running_loop(), {})
+    if host not in schedulers:
+        schedulers[host] = PriorityScheduler(limit)
+    return schedulers[host]
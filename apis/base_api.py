@@ -1,8 +1,50 @@
-from typing import Any, Dict, List
+import asyncio
+import hashlib
+import os
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from functools import lru_cache
+from typing import Any, Callable, Dict, List, Optional, Set
 
 import pydash
+from dotenv import load_dotenv
 
+from api_helpers.checkpoint import CrawlCheckpoint
 from api_helpers.fetcher import GraphFetcher
+from api_helpers.scheduler import Priority, scheduling
+from models.character import Character, build_characters
+
+load_dotenv()
+
+normalize_executor = os.getenv("NORMALIZE_EXECUTOR", "")
+offload_threshold = int(os.getenv("NORMALIZE_OFFLOAD_THRESHOLD", 5000))
+enable_recursive_fetch = os.getenv("ENABLE_RECURSIVE_FETCH", "").lower() == "true"
+
+
+@lru_cache(maxsize=None)
+def get_executor(kind: str) -> Optional[Executor]:
+    """
+    Get a shared executor for off-loop normalization.
+    :param kind: "thread", "process" or empty to normalize on the event loop.
+    :return: Executor or None.
+    """
+    if kind == "thread":
+        return ThreadPoolExecutor()
+    if kind == "process":
+        return ProcessPoolExecutor()
+    return None
+
+
+def normalize_batch(
+    normalize_rows: Callable[..., List[Dict[str, Any]]],
+    raw_data: List[Dict[str, Any]],
+    details_dict: Dict[str, Any],
+    trusted: bool,
+) -> List[Character]:
+    """
+    Normalize raw data and build the characters in one batch.
+    Module level so it can be sent to a process pool.
+    """
+    return build_characters(normalize_rows(raw_data, details_dict), trusted=trusted)
 
 
 class CharacterAPI:
@@ -10,11 +52,20 @@ class CharacterAPI:
     Base class for character API services
     """
 
+    # Skip validation when normalize_rows output already matches the model
+    trusted = False
+    # Raw keys holding the enrichment links each Character field is built from
+    enrichment_keys: Dict[str, List[str]] = {}
+
     def __init__(self, rate_limit: int = 20):
         """
         Initialize the character API service.
         """
-        self.fetcher = GraphFetcher(rate_limit)
+        self.fetcher = GraphFetcher(rate_limit, enable_recursive_fetch)
+        self.executor = get_executor(normalize_executor)
+        self.checkpoint: Optional[CrawlCheckpoint] = None
+        # Requested Character fields, None for all fields and full enrichment
+        self.fields: Optional[Set[str]] = None
 
     async def fetch_data(self) -> List[Dict[str, Any]]:
         """
@@ -23,33 +74,160 @@ class CharacterAPI:
         """
         raise NotImplementedError("fetch_data must be implemented by subclasses")
 
+    @staticmethod
+    def normalize_rows(
+        raw_data: List[Dict[str, Any]], details_dict: Dict[str, Any]
+    ) -> List[Dict[str, Any]]:
+        """
+        Normalize the raw data from the API into Character rows.
+        :param raw_data: Raw character data.
+        :param details_dict: Fetched details, keyed by URL.
+        :return: Normalized character rows.
+        """
+        raise NotImplementedError("normalize_rows must be implemented by subclasses")
+
     async def normalize_data(self, raw_data: List[Dict[str, Any]]) -> list[Any]:
         """
         Normalize the raw data from the API.
+        Large batches run on the executor so the event loop stays responsive.
         :param raw_data: Raw character data.
         :return: Normalized character data.
         """
-        raise NotImplementedError("normalize_data must be implemented by subclasses")
+        args = (self.normalize_rows, raw_data, self.fetcher.details_dict, self.trusted)
+        if self.executor is None or len(raw_data) < offload_threshold:
+            return normalize_batch(*args)
+
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, normalize_batch, *args)
+
+    def enrichment_roots(self, data: List[Dict[str, Any]]) -> List[Any]:
+        """
+        Get the nodes to enrich, limited to the links of the requested fields.
+        :param data: Raw character data.
+        :return: Nodes to traverse.
+        """
+        keys = self.enrichment_link_keys()
+        if keys is None:
+            return data
+        if not keys:
+            return []
+        return [{key: item.get(key) for key in keys} for item in data]
+
+    def enrichment_link_keys(self) -> Optional[Set[str]]:
+        """
+        Get the raw keys whose links the requested fields are built from.
+        :return: Set of raw keys, None for full enrichment.
+        """
+        if self.fields is None:
+            return None
+
+        return {
+            key
+            for field in self.fields
+            for key in self.enrichment_keys.get(field.split(".", 1)[0], [])
+        }
+
+    def detail_link_keys(self) -> Set[str]:
+        """
+        Get the raw keys whose links normalize_rows reads, they are fetched
+        before the links kept for optional enrichment.
+        :return: Set of raw keys.
+        """
+        keys = self.enrichment_link_keys()
+        if keys is None:
+            return {key for links in self.enrichment_keys.values() for key in links}
+        return keys
+
+    def checkpoint_key(self, url: str) -> str:
+        """
+        Get the checkpoint key of a crawl, crawls with a different URL or
+        enrichment selection do not share a checkpoint.
+        :param url: First page URL.
+        :return: Checkpoint key.
+        """
+        keys = self.enrichment_link_keys()
+        selection = "*" if keys is None else ",".join(sorted(keys))
+        digest = hashlib.sha1(f"{url}|{selection}".encode()).hexdigest()[:12]
+        return f"{type(self).__name__}-{digest}"
 
     async def fetch_paginated_data(
         self, url: str, data_key: str = "results", next_key: str = "next"
     ) -> List[Dict[str, Any]]:
         """
         Fetch paginated data from an API.
+        Resumes from the last checkpoint of the same crawl if there is one,
+        the checkpoint is removed once every page was fetched.
+        """
+        self.checkpoint = CrawlCheckpoint.for_crawl(self.checkpoint_key(url))
+        try:
+            return await self._crawl(url, data_key, next_key)
+        finally:
+            if self.checkpoint is not None:
+                self.checkpoint.release()
+
+    async def _crawl(
+        self, url: str, data_key: str, next_key: str
+    ) -> List[Dict[str, Any]]:
         """
-        data = []
-        next_url = url
+        Fetch the pages and enrich them, checkpointing the progress.
+        """
+        data: List[Dict[str, Any]] = []
+        next_url: Optional[str] = url
+
+        if self.checkpoint is not None:
+            # Replay the log, fetched details are reused and walked again
+            for record in self.checkpoint.load():
+                if "page" in record:
+                    data.extend(record["page"])
+                    next_url = record.get("next_url")
+                elif "detail" in record:
+                    self.fetcher.details_dict[record["detail"]] = record.get("data")
+            self.fetcher.checkpoint = self.checkpoint
+
+        # Enrich each page while the next ones are fetched, page fetches keep
+        # precedence over the detail fetches through the scheduler, which keep
+        # precedence over the optional enrichment
+        detail_keys = self.detail_link_keys()
+        enrichment = [
+            asyncio.create_task(
+                self.fetcher.fetch_graph(self.enrichment_roots(list(data)), detail_keys)
+            )
+        ]
+        try:
+            while next_url:
+                with scheduling(priority=Priority.PAGE):
+                    response = await self.fetcher.safe_fetch_single(next_url)
+
+                if not response:
+                    print(f"No response received for URL: {next_url}")
+                    break
 
-        while next_url:
-            response = await self.fetcher.safe_fetch_single(next_url)
+                page = pydash.get(response, data_key, [])
+                data.extend(page)
+                next_url = pydash.get(response, next_key, None)
+                enrichment.append(
+                    asyncio.create_task(
+                        self.fetcher.fetch_graph(
+                            self.enrichment_roots(page), detail_keys
+                        )
+                    )
+                )
+                if self.checkpoint is not None:
+                    self.checkpoint.append({"page": page, "next_url": next_url})
+                    await self.checkpoint.maybe_save()
 
-            if not response:
-                print(f"No response received for URL: {next_url}")
-                break
+            if self.checkpoint is not None:
+                await self.checkpoint.save()
 
-            data.extend(pydash.get(response, data_key, []))
-            next_url = pydash.get(response, next_key, None)
+            await asyncio.gather(*enrichment)
+        finally:
+            for task in enrichment:
+                task.cancel()
 
-        # Enrich the data with details
-        await self.fetcher.fetch_graph(data)
+        # Keep the checkpoint if pagination stopped early, to resume from there
+        if self.checkpoint is not None:
+            if next_url:
+                await self.checkpoint.save()
+            else:
+                self.checkpoint.clear()
         return data
@@ -5,7 +5,7 @@ import pydash
 from dotenv import load_dotenv
 
 from apis.base_api import CharacterAPI
-from models.character import Character, OriginEnum
+from models.character import OriginEnum
 
 load_dotenv()
 
@@ -15,6 +15,8 @@ class PokeAPI(CharacterAPI):
     Service class for the Pokémon API
     """
 
+    enrichment_keys = {"species": ["url"]}
+
     def __init__(self):
         """
         Initialize the Pokémon API service.
@@ -31,14 +33,18 @@ class PokeAPI(CharacterAPI):
         """
         return await self.fetch_paginated_data(self.API_URL)
 
-    async def normalize_data(self, raw_data: List[Dict[str, Any]]) -> list[Character]:
+    @staticmethod
+    def normalize_rows(
+        raw_data: List[Dict[str, Any]], details_dict: Dict[str, Any]
+    ) -> List[Dict[str, Any]]:
         """
         Normalize the raw data from the API.
         :param raw_data: Raw character data.
-        :return: Normalized character data.
+        :param details_dict: Fetched details, keyed by URL.
+        :return: Normalized character rows.
         """
         seen = set()
-        characters = []
+        rows = []
         for item in raw_data:
             name = item["name"].capitalize()
             if name in seen:
@@ -47,18 +53,18 @@ class PokeAPI(CharacterAPI):
             seen.add(name)
 
             spec_url = item.get("url", "Unknown")
-            spec_details = self.fetcher.details_dict.get(spec_url, {})
+            spec_details = details_dict.get(spec_url, {})
             types = pydash.get(spec_details, "types", [])
             types = [pydash.get(t, "type.name", "Unknown") for t in types]
 
-            characters.append(
-                Character(
-                    name=name,
-                    origin=OriginEnum.POKEMON,
-                    species=", ".join(types),
-                    additional_attributes={
+            rows.append(
+                {
+                    "name": name,
+                    "origin": OriginEnum.POKEMON,
+                    "species": ", ".join(types),
+                    "additional_attributes": {
                         "base_experience": item.get("base_experience", 0),
                     },
-                )
+                }
             )
-        return characters
+        return rows
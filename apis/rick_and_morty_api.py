@@ -4,7 +4,7 @@ from typing import Any, Dict, List
 from dotenv import load_dotenv
 
 from apis.base_api import CharacterAPI
-from models.character import Character, OriginEnum
+from models.character import OriginEnum
 
 load_dotenv()
 
@@ -29,28 +29,32 @@ class RickAndMortyAPI(CharacterAPI):
             self.API_URL, data_key="results", next_key="info.next"
         )
 
-    async def normalize_data(self, raw_data: List[Dict[str, Any]]) -> list[Character]:
+    @staticmethod
+    def normalize_rows(
+        raw_data: List[Dict[str, Any]], details_dict: Dict[str, Any]
+    ) -> List[Dict[str, Any]]:
         """
         Normalize the raw data from the API.
         :param raw_data: Raw character data.
-        :return: Normalized character data.
+        :param details_dict: Fetched details, keyed by URL.
+        :return: Normalized character rows.
         """
         seen = set()
-        characters = []
+        rows = []
         for item in raw_data:
             name = item["name"]
             if name in seen:
                 continue
 
             seen.add(name)
-            characters.append(
-                Character(
-                    name=name,
-                    origin=OriginEnum.RICK_AND_MORTY,
-                    species=item.get("species", "Unknown"),
-                    additional_attributes={
+            rows.append(
+                {
+                    "name": name,
+                    "origin": OriginEnum.RICK_AND_MORTY,
+                    "species": item.get("species", "Unknown"),
+                    "additional_attributes": {
                         "status": item.get("status", "Unknown"),
                     },
-                )
+                }
             )
-        return characters
+        return rows
@@ -4,7 +4,7 @@ from typing import Any, Dict, List
 from dotenv import load_dotenv
 
 from apis.base_api import CharacterAPI
-from models.character import Character, OriginEnum
+from models.character import OriginEnum
 
 load_dotenv()
 
@@ -14,6 +14,8 @@ class SWAPI(CharacterAPI):
     Service class for the Star Wars API
     """
 
+    enrichment_keys = {"species": ["species"]}
+
     def __init__(self):
         """
         Initialize the Star Wars API service.
@@ -30,36 +32,37 @@ class SWAPI(CharacterAPI):
             self.API_URL, data_key="results", next_key="next"
         )
 
-    async def normalize_data(self, raw_data: List[Dict[str, Any]]) -> list[Character]:
+    @staticmethod
+    def normalize_rows(
+        raw_data: List[Dict[str, Any]], details_dict: Dict[str, Any]
+    ) -> List[Dict[str, Any]]:
         """
         Normalize the raw data from the API.
         :param raw_data: Raw character data.
-        :return: Normalized character data.
+        :param details_dict: Fetched details, keyed by URL.
+        :return: Normalized character rows.
         """
         seen = set()
-        characters = []
+        rows = []
         for item in raw_data:
             name = item["name"]
             if name in seen:
                 continue
 
             species = item.get("species", ["Unknown"])
-            species = [
-                self.fetcher.details_dict.get(spec, {}).get("name", spec)
-                for spec in species
-            ]
+            species = [details_dict.get(spec, {}).get("name", spec) for spec in species]
 
             seen.add(name)
-            characters.append(
-                Character(
-                    name=name,
-                    origin=OriginEnum.STAR_WARS,
-                    species=", ".join(species),
-                    additional_attributes={
+            rows.append(
+                {
+                    "name": name,
+                    "origin": OriginEnum.STAR_WARS,
+                    "species": ", ".join(species),
+                    "additional_attributes": {
                         "birth_year": item.get("birth_year", "Unknown"),
                         # Example of a new attribute
                         # "height": item.get("height", "Unknown"),
                     },
-                )
+                }
             )
-        return characters
+        return rows
@@ -0,0 +1,342 @@
+"""
+Microbenchmarks for the normalize, merge, sort and serialize hot paths.
+
+Synthetic upstream payloads are generated for each source, every stage is
+timed (median of --repeat samples of at least --min-time seconds each) and
+memory-profiled (tracemalloc peak) in isolation, and the results can be saved
+as a baseline or compared against it. Baselines are machine specific, they are
+generated locally and not committed.
+
+    python -m benchmarks.microbench --sizes 1000 10000
+    python -m benchmarks.microbench --save-baseline
+    python -m benchmarks.microbench --compare --threshold 0.2
+"""
+
+import argparse
+import asyncio
+import gc
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from functools import partial
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from apis.api_aggregator import APIAggregator
+from apis.base_api import CharacterAPI, normalize_batch
+from apis.poke_api import PokeAPI
+from apis.rick_and_morty_api import RickAndMortyAPI
+from apis.swapi_api import SWAPI
+from models.character import Character, dump_characters
+from storage.file_storage import FileStorageManager
+
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), "baseline.json")
+DEFAULT_SIZES = [1000, 10000, 100000, 1000000]
+DEFAULT_REPEAT = 5
+DEFAULT_MIN_TIME = 0.2
+SEED = 0
+
+Payload = Tuple[List[Dict[str, Any]], Dict[str, Any]]
+
+
+def generate_payloads(
+    size: int, dup_ratio: float, seed: int = SEED
+) -> Dict[str, Payload]:
+    """
+    Generate synthetic raw data and fetched details for every source.
+    :param size: Number of raw records per source.
+    :param dup_ratio: Share of records named from a pool shared by all sources,
+        producing duplicates both within and across sources.
+    :param seed: Random seed, the same arguments always give the same payloads.
+    :return: Raw data and details dict, keyed by source.
+    """
+    rng = random.Random(seed)
+    shared_pool = max(1, int(size * dup_ratio))
+
+    def name(source: str, index: int) -> str:
+        if rng.random() < dup_ratio:
+            return f"Shared-{rng.randrange(shared_pool)}"
+        return f"{source}-{index}"
+
+    species = [f"https://swapi.dev/api/species/{i}/" for i in range(1, 38)]
+    swapi_details = {url: {"name": f"Species {i}"} for i, url in enumerate(species)}
+    swapi_raw = [
+        {
+            "name": name("swapi", i),
+            "species": rng.sample(species, rng.randint(0, 2)),
+            "birth_year": f"{rng.randint(1, 900)}BBY",
+        }
+        for i in range(size)
+    ]
+
+    poke_raw = []
+    poke_details = {}
+    for i in range(size):
+        url = f"https://pokeapi.co/api/v2/pokemon/{i}/"
+        poke_raw.append({"name": name("poke", i), "url": url})
+        poke_details[url] = {
+            "types": [
+                {"type": {"name": f"type-{rng.randrange(18)}"}}
+                for _ in range(rng.randint(1, 2))
+            ]
+        }
+
+    rick_raw = [
+        {
+            "name": name("rick", i),
+            "species": rng.choice(["Human", "Alien", "Robot"]),
+            "status": rng.choice(["Alive", "Dead", "unknown"]),
+        }
+        for i in range(size)
+    ]
+
+    return {
+        "PokeAPI": (poke_raw, poke_details),
+        "SWAPI": (swapi_raw, swapi_details),
+        "RickAndMortyAPI": (rick_raw, {}),
+    }
+
+
+def normalize(api: CharacterAPI, payload: Payload) -> List[Character]:
+    """
+    Run the synchronous normalization path of an API.
+    """
+    raw_data, details_dict = payload
+    return normalize_batch(api.normalize_rows, raw_data, details_dict, api.trusted)
+
+
+def measure(
+    setup: Callable[[], Any],
+    stage: Callable[[Any], Any],
+    repeat: int,
+    min_time: float = DEFAULT_MIN_TIME,
+) -> Dict[str, float]:
+    """
+    Time and memory-profile a stage, setup runs untimed before every run.
+    :param setup: Builds fresh input for the stage.
+    :param stage: Stage to measure.
+    :param repeat: Number of timed samples, the median one is kept.
+    :param min_time: Minimum timed seconds per sample, fast stages run several
+        times per sample so timer and scheduling noise average out.
+    :return: Median time of a run in seconds and peak allocated memory in bytes.
+    """
+    samples = []
+    for _ in range(repeat):
+        runs, elapsed = 0, 0.0
+        while runs == 0 or elapsed < min_time:
+            state = setup()
+            gc_enabled = gc.isenabled()
+            gc.disable()
+            try:
+                start = time.perf_counter()
+                stage(state)
+                elapsed += time.perf_counter() - start
+            finally:
+                if gc_enabled:
+                    gc.enable()
+            runs += 1
+        samples.append(elapsed / runs)
+
+    state = setup()
+    tracemalloc.start()
+    stage(state)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {"seconds": statistics.median(samples), "peak_bytes": peak}
+
+
+def run_suite(
+    size: int, dup_ratio: float, repeat: int, min_time: float = DEFAULT_MIN_TIME
+) -> Dict[str, Dict[str, float]]:
+    """
+    Measure every stage at one size.
+    :return: Measurements keyed by stage name.
+    """
+    payloads = generate_payloads(size, dup_ratio)
+    apis: List[CharacterAPI] = [PokeAPI(), SWAPI(), RickAndMortyAPI()]
+    aggregator = APIAggregator(apis)
+    timed = partial(measure, repeat=repeat, min_time=min_time)
+    results = {}
+
+    for api in apis:
+        source = type(api).__name__
+        results[f"normalize_data[{source}]"] = timed(
+            partial(payloads.get, source), partial(normalize, api)
+        )
+
+    def normalized() -> List[List[Character]]:
+        return [normalize(api, payloads[type(api).__name__]) for api in apis]
+
+    def merge(batches: List[List[Character]]) -> List[Character]:
+        character_map: Dict[str, Character] = {}
+        for characters in batches:
+            aggregator._merge_characters(character_map, characters)
+        return list(character_map.values())
+
+    # Merging updates the characters in place, it needs fresh batches every run
+    results["_merge_characters"] = timed(normalized, merge)
+
+    species_pairs = [
+        (f"type-{i % 18}, type-{i % 7}".split(", "), [f"type-{i % 5}"])
+        for i in range(size)
+    ]
+    results["_merge_lists"] = timed(
+        lambda: species_pairs,
+        lambda pairs: [APIAggregator._merge_lists(a, b) for a, b in pairs],
+    )
+
+    # The remaining stages only read the merged characters, build them once
+    merged = merge(normalized())
+    results["sort"] = timed(
+        lambda: merged, lambda chars: sorted(chars, key=lambda x: x.name.lower())
+    )
+    results["model_dump"] = timed(
+        lambda: merged, lambda chars: [char.model_dump() for char in chars]
+    )
+    results["dump_characters"] = timed(lambda: merged, dump_characters)
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        file_name = os.path.join(tmp_dir, "characters.json")
+        results["FileStorageManager.save"] = timed(
+            lambda: merged,
+            lambda chars: asyncio.run(
+                FileStorageManager().save(chars, file_name=file_name)
+            ),
+        )
+
+    return results
+
+
+def run_params(
+    dup_ratio: float, repeat: int, min_time: float = DEFAULT_MIN_TIME
+) -> Dict[str, Any]:
+    """
+    Parameters and environment a run depends on, stored with the baseline.
+    """
+    return {
+        "dup_ratio": dup_ratio,
+        "repeat": repeat,
+        "min_time": min_time,
+        "seed": SEED,
+        "python": platform.python_version(),
+        "implementation": platform.python_implementation(),
+        "system": platform.system(),
+        "machine": platform.machine(),
+    }
+
+
+def param_mismatches(params: Dict[str, Any], baseline: Dict[str, Any]) -> List[str]:
+    """
+    Compare the parameters of a run with the ones of a baseline.
+    :return: Mismatch messages, empty if the results are comparable.
+    """
+    baseline_params = baseline.get("params")
+    if baseline_params is None:
+        return ["baseline has no recorded parameters, save a new one"]
+    return [
+        f"{key}: baseline {baseline_params.get(key)!r}, run {value!r}"
+        for key, value in params.items()
+        if baseline_params.get(key) != value
+    ]
+
+
+def missing_entries(results: Dict[str, Any], baseline: Dict[str, Any]) -> List[str]:
+    """
+    Find the measured sizes and stages the baseline has no entry for.
+    :return: Messages, empty if every result can be compared.
+    """
+    missing = []
+    for size, stages in results.items():
+        if size not in baseline:
+            missing.append(f"size {size} is not in the baseline")
+            continue
+        missing.extend(
+            f"{stage} @ {size} is not in the baseline"
+            for stage in stages
+            if stage not in baseline[size]
+        )
+    return missing
+
+
+def compare(
+    results: Dict[str, Any], baseline: Dict[str, Any], threshold: float
+) -> List[str]:
+    """
+    Compare results against a baseline, see missing_entries for the results
+    that cannot be compared.
+    :param threshold: Allowed relative slowdown or memory growth, e.g; 0.2.
+    :return: Regression messages, empty if there is none.
+    """
+    regressions = []
+    for size, stages in results.items():
+        for stage, current in stages.items():
+            previous = baseline.get(size, {}).get(stage)
+            if previous is None:
+                continue
+            for metric in ("seconds", "peak_bytes"):
+                if previous[metric] and current[metric] > previous[metric] * (
+                    1 + threshold
+                ):
+                    regressions.append(
+                        f"{stage} @ {size}: {metric} "
+                        f"{previous[metric]:.6g} -> {current[metric]:.6g}"
+                    )
+    return regressions
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """
+    Run the suite from the command line.
+    :return: Exit code, 1 if a regression was found, 2 if the baseline was
+        recorded with other parameters or misses some of the results.
+    """
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES)
+    parser.add_argument("--dup-ratio", type=float, default=0.1)
+    parser.add_argument("--repeat", type=int, default=DEFAULT_REPEAT)
+    parser.add_argument("--min-time", type=float, default=DEFAULT_MIN_TIME)
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--compare", action="store_true")
+    parser.add_argument("--threshold", type=float, default=0.2)
+    args = parser.parse_args(argv)
+
+    results = {}
+    for size in args.sizes:
+        results[str(size)] = run_suite(size, args.dup_ratio, args.repeat, args.min_time)
+        for stage, measurement in results[str(size)].items():
+            print(
+                f"{size:>8} {stage:<36} {measurement['seconds'] * 1000:>10.2f} ms "
+                f"{measurement['peak_bytes'] / 2**20:>10.2f} MiB"
+            )
+
+    params = run_params(args.dup_ratio, args.repeat, args.min_time)
+    if args.save_baseline:
+        with open(args.baseline, "w") as file:
+            json.dump({"params": params, "results": results}, file, indent=4)
+        print(f"Baseline saved to {args.baseline}")
+
+    if args.compare:
+        with open(args.baseline) as file:
+            baseline = json.load(file)
+        mismatches = param_mismatches(params, baseline) or missing_entries(
+            results, baseline["results"]
+        )
+        for mismatch in mismatches:
+            print(f"NOT COMPARABLE {mismatch}")
+        if mismatches:
+            return 2
+        regressions = compare(results, baseline["results"], args.threshold)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
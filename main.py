@@ -1,16 +1,120 @@
+import asyncio
 import os
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict, List, Optional, Set, Tuple, Type
 
 from dotenv import load_dotenv
-from fastapi import FastAPI
+from fastapi import FastAPI, Header, HTTPException, Response
 
+from api_helpers.scheduler import RequestClass, scheduling
 from apis.api_aggregator import APIAggregator
+from apis.base_api import CharacterAPI
 from apis.poke_api import PokeAPI
 from apis.rick_and_morty_api import RickAndMortyAPI
 from apis.swapi_api import SWAPI
+from models.character import dump_characters, parse_fields, project_characters
 from storage.file_storage import FileStorageManager
+from storage.snapshot import CharacterSnapshot, SnapshotCache
 
 load_dotenv()
-app = FastAPI()
+
+refresh_interval = float(os.getenv("REFRESH_INTERVAL_SECONDS", 0))
+snapshot_max_age = float(os.getenv("SNAPSHOT_MAX_AGE_SECONDS", 60))
+snapshot_cache_size = int(os.getenv("SNAPSHOT_CACHE_SIZE", 16))
+
+SOURCES: Dict[str, Type[CharacterAPI]] = {
+    "pokeapi": PokeAPI,
+    "swapi": SWAPI,
+    "rickandmorty": RickAndMortyAPI,
+}
+
+# One snapshot per (sources, fields) selection so their validators do not mix,
+# bounded since clients choose the selections
+snapshots = SnapshotCache(maxsize=snapshot_cache_size)
+
+
+def parse_sources(value: Optional[str]) -> List[str]:
+    """
+    Parse a comma-separated source selection, e.g; "swapi,pokeapi".
+    :param value: Raw selection, None or empty for all sources.
+    :return: Selected source names.
+    """
+    if not value:
+        return list(SOURCES)
+
+    sources = list(dict.fromkeys(s.strip() for s in value.split(",") if s.strip()))
+    if not sources:
+        raise ValueError("No sources selected")
+    unknown = [source for source in sources if source not in SOURCES]
+    if unknown:
+        raise ValueError(f"Unknown sources: {', '.join(unknown)}")
+    return sources
+
+
+def selection_key(
+    source_names: List[str], requested_fields: Optional[Set[str]]
+) -> Tuple[str, str]:
+    """
+    Key of the snapshot of a (sources, fields) selection.
+    """
+    return ",".join(sorted(source_names)), ",".join(sorted(requested_fields or []))
+
+
+async def collect_characters(
+    source_names: List[str], requested_fields: Optional[Set[str]]
+) -> CharacterSnapshot:
+    """
+    Crawl the selected sources and update the snapshot of the selection.
+    Only full results (all sources and fields) are saved to the file.
+    :param source_names: Sources to fetch, see SOURCES.
+    :param requested_fields: Fields parsed by parse_fields, None for all fields.
+    :return: Updated snapshot.
+    """
+    file_name = os.getenv("FILE_NAME") or "characters.json"
+    apis = [SOURCES[name]() for name in source_names]
+    for api in apis:
+        api.fields = requested_fields
+    aggregator = APIAggregator(apis)
+    characters = await aggregator.aggregate_characters()
+
+    if len(source_names) == len(SOURCES) and requested_fields is None:
+        file_storage = FileStorageManager()
+        await file_storage.save(characters, file_name)
+
+    snapshot = snapshots.get_or_create(selection_key(source_names, requested_fields))
+    snapshot.update(project_characters(dump_characters(characters), requested_fields))
+    return snapshot
+
+
+async def refresh_characters(interval: float) -> None:
+    """
+    Keep the full snapshot up to date in the background.
+    Runs as background work, interactive requests preempt its fetches.
+    :param interval: Seconds between refreshes.
+    """
+    with scheduling(request_class=RequestClass.BACKGROUND):
+        while True:
+            try:
+                await collect_characters(list(SOURCES), None)
+            except Exception as e:
+                print(f"Background refresh failed: {str(e)}")
+            await asyncio.sleep(interval)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI) -> AsyncIterator[None]:
+    """
+    Start the background refresh if REFRESH_INTERVAL_SECONDS is set.
+    """
+    task = None
+    if refresh_interval > 0:
+        task = asyncio.create_task(refresh_characters(refresh_interval))
+    yield
+    if task is not None:
+        task.cancel()
+
+
+app = FastAPI(lifespan=lifespan)
 
 
 @app.get("/")
@@ -22,17 +126,48 @@ async def root() -> dict:
 
 
 @app.get("/characters")
-async def get_characters():
+async def get_characters(
+    response: Response,
+    since: Optional[str] = None,
+    sources: Optional[str] = None,
+    fields: Optional[str] = None,
+    if_none_match: Optional[str] = Header(None),
+    if_modified_since: Optional[str] = Header(None),
+):
     """
     Get characters from multiple APIs.
+    Answers conditional requests with 304 when the snapshot did not change,
+    conditional requests are served from the snapshot without crawling while
+    it is younger than SNAPSHOT_MAX_AGE_SECONDS.
+    :param since: X-Snapshot-Version token, only characters changed after it are
+        returned. The full list is returned when the token cannot be served,
+        X-Snapshot-Delta tells which one was sent.
+    :param sources: Comma-separated sources to fetch, see SOURCES.
+    :param fields: Comma-separated Character fields to return, additional
+        attributes can be selected with "additional_attributes.<key>".
     :return: List of characters.
     """
-    file_name = os.getenv("FILE_NAME") or "characters.json"
-    #apis = [RickAndMortyAPI()]  # Play with it
-    apis = [PokeAPI(), SWAPI(), RickAndMortyAPI()]
-    aggregator = APIAggregator(apis)
-    characters = await aggregator.aggregate_characters()
+    try:
+        source_names = parse_sources(sources)
+        requested_fields = parse_fields(fields)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    # Conditional polls are answered from a fresh snapshot without a crawl
+    snapshot = snapshots.get(selection_key(source_names, requested_fields))
+    conditional = any(
+        header is not None for header in (since, if_none_match, if_modified_since)
+    )
+    if snapshot is None or not conditional or not snapshot.is_fresh(snapshot_max_age):
+        with scheduling(request_class=RequestClass.INTERACTIVE):
+            snapshot = await collect_characters(source_names, requested_fields)
+
+    response.headers.update(snapshot.headers())
+    if since is not None:
+        changed = snapshot.changed_since(since)
+        response.headers["X-Snapshot-Delta"] = "false" if changed is None else "true"
+        return snapshot.characters if changed is None else changed
 
-    file_storage = FileStorageManager()
-    await file_storage.save(characters, file_name)
-    return [char.model_dump() for char in characters]
+    if snapshot.is_not_modified(if_none_match, if_modified_since):
+        return Response(status_code=304, headers=snapshot.headers())
+    return snapshot.characters
@@ -1,7 +1,7 @@
 from enum import Enum
-from typing import Any, Dict
+from typing import Any, Dict, List, Optional, Set
 
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, TypeAdapter
 
 
 class OriginEnum(str, Enum):
@@ -23,3 +23,84 @@ class Character(BaseModel):
     origin: OriginEnum
     species: str
     additional_attributes: Dict[str, Any] = Field(default_factory=dict)
+
+
+character_list_adapter = TypeAdapter(List[Character])
+
+
+def build_characters(
+    rows: List[Dict[str, Any]], trusted: bool = False
+) -> List[Character]:
+    """
+    Build Character objects from a batch of normalized rows.
+    :param rows: Normalized character rows.
+    :param trusted: Skip validation, rows must already match the model.
+    :return: List of Character objects.
+    """
+    if trusted:
+        return [Character.model_construct(**row) for row in rows]
+    return character_list_adapter.validate_python(rows)
+
+
+def dump_characters(characters: List[Character]) -> List[Dict[str, Any]]:
+    """
+    Dump a batch of Character objects to dictionaries.
+    :param characters: List of Character objects.
+    :return: List of dictionaries.
+    """
+    return character_list_adapter.dump_python(characters)
+
+
+def parse_fields(value: Optional[str]) -> Optional[Set[str]]:
+    """
+    Parse a comma-separated field projection, e.g; "species,additional_attributes.x".
+    The name identifies a character and is always included.
+    :param value: Raw projection, None or empty for all fields.
+    :return: Set of requested fields, None for all fields.
+    """
+    if not value:
+        return None
+
+    fields = {field.strip() for field in value.split(",") if field.strip()}
+    unknown = {
+        field
+        for field in fields
+        if field not in Character.model_fields
+        and not field.startswith("additional_attributes.")
+    }
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(sorted(unknown))}")
+    return fields | {"name"}
+
+
+def project_characters(
+    rows: List[Dict[str, Any]], fields: Optional[Set[str]]
+) -> List[Dict[str, Any]]:
+    """
+    Keep only the requested fields of dumped characters.
+    :param rows: Dumped characters.
+    :param fields: Fields parsed by parse_fields, None for all fields.
+    :return: Projected characters.
+    """
+    if fields is None:
+        return rows
+
+    # Keep the model field order, the same for every process
+    requested = {field.split(".", 1)[0] for field in fields}
+    top_level = [field for field in Character.model_fields if field in requested]
+    attributes = {
+        field.split(".", 1)[1]
+        for field in fields
+        if field not in Character.model_fields
+    }
+    projected = []
+    for row in rows:
+        item = {key: row[key] for key in top_level}
+        if "additional_attributes" in item and "additional_attributes" not in fields:
+            item["additional_attributes"] = {
+                key: value
+                for key, value in row["additional_attributes"].items()
+                if key in attributes
+            }
+        projected.append(item)
+    return projected
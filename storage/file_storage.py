@@ -1,7 +1,7 @@
 import json
 from typing import List
 
-from models.character import Character
+from models.character import Character, dump_characters
 from storage.manager import BaseStorageManager
 
 
@@ -19,4 +19,4 @@ class FileStorageManager(BaseStorageManager):
         :param file_name: Name of the file to save data to.
         """
         with open(file_name, "w") as file:
-            json.dump([char.model_dump() for char in data], file, indent=4)
+            json.dump(dump_characters(data), file, indent=4)
@@ -0,0 +1,177 @@
+import hashlib
+import json
+import time
+import uuid
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Any, Dict, Hashable, List, Optional
+
+
+def content_hash(data: Any) -> str:
+    """
+    Stable hash of JSON serializable data.
+    :param data: Data to hash.
+    :return: Hex digest.
+    """
+    encoded = json.dumps(data, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(encoded.encode()).hexdigest()
+
+
+class CharacterSnapshot:
+    """
+    In-memory snapshot of the last aggregated characters.
+
+    Tracks a content hash and last-modified time for conditional requests,
+    and the snapshot version each character last changed in for delta reads.
+    Version tokens carry a random epoch, tokens of another process or of a
+    previous run never match.
+    """
+
+    def __init__(self) -> None:
+        """
+        Initialize an empty snapshot.
+        """
+        self.epoch = uuid.uuid4().hex[:8]
+        self.version = 0
+        self.etag = ""
+        self.last_modified = datetime.fromtimestamp(0, tz=timezone.utc)
+        self.characters: List[Dict[str, Any]] = []
+        self._hashes: Dict[str, str] = {}
+        self._changed_in: Dict[str, int] = {}
+        # Version of the last removal, deltas cannot express removals
+        self._removed_in = 0
+        # Monotonic time of the last update, changed or not
+        self.refreshed_at: Optional[float] = None
+
+    @property
+    def token(self) -> str:
+        """
+        Version token of the snapshot, e.g; "3f2a9c1d.4".
+        """
+        return f"{self.epoch}.{self.version}"
+
+    def update(self, characters: List[Dict[str, Any]]) -> None:
+        """
+        Replace the snapshot, bumping the version only if the content changed.
+        :param characters: Dumped characters, sorted as they are served.
+        """
+        self.refreshed_at = time.monotonic()
+        hashes = {char["name"]: content_hash(char) for char in characters}
+        etag = content_hash([hashes[char["name"]] for char in characters])
+        if etag == self.etag:
+            return
+
+        self.version += 1
+        for name, char_hash in hashes.items():
+            if self._hashes.get(name) != char_hash:
+                self._changed_in[name] = self.version
+        for name in self._hashes.keys() - hashes.keys():
+            self._changed_in.pop(name, None)
+            self._removed_in = self.version
+
+        self.etag = etag
+        # HTTP dates have a one second resolution, keep them strictly increasing
+        # so If-Modified-Since never matches content it was not sent
+        self.last_modified = max(
+            datetime.now(timezone.utc).replace(microsecond=0),
+            self.last_modified + timedelta(seconds=1),
+        )
+        self.characters = characters
+        self._hashes = hashes
+
+    def is_fresh(self, max_age: float) -> bool:
+        """
+        Return True if the snapshot was refreshed less than max_age seconds ago.
+        """
+        return (
+            self.refreshed_at is not None
+            and time.monotonic() - self.refreshed_at < max_age
+        )
+
+    def changed_since(self, token: str) -> Optional[List[Dict[str, Any]]]:
+        """
+        Get the characters that changed after a snapshot version.
+        :param token: Version token the client already has.
+        :return: Changed characters, None if the token is unknown (another
+            epoch, a future version) or characters were removed since then,
+            the client must then replace its copy with the full list.
+        """
+        epoch, _, version = token.partition(".")
+        if epoch != self.epoch or not version.isdigit():
+            return None
+        since = int(version)
+        if since > self.version or since < self._removed_in:
+            return None
+        return [
+            char for char in self.characters if self._changed_in[char["name"]] > since
+        ]
+
+    def headers(self) -> Dict[str, str]:
+        """
+        Validator headers for the current snapshot.
+        """
+        return {
+            "ETag": f'"{self.etag}"',
+            "Last-Modified": format_datetime(self.last_modified, usegmt=True),
+            "X-Snapshot-Version": self.token,
+        }
+
+    def is_not_modified(
+        self, if_none_match: Optional[str], if_modified_since: Optional[str]
+    ) -> bool:
+        """
+        Evaluate conditional request headers against the snapshot.
+        If-None-Match takes precedence over If-Modified-Since.
+        :param if_none_match: Value of the If-None-Match header.
+        :param if_modified_since: Value of the If-Modified-Since header.
+        :return: True if a 304 response should be sent.
+        """
+        if if_none_match is not None:
+            tags = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+            return "*" in tags or f'"{self.etag}"' in tags
+
+        if if_modified_since is not None:
+            try:
+                since = parsedate_to_datetime(if_modified_since)
+            except (TypeError, ValueError):
+                return False
+            if since.tzinfo is None:
+                since = since.replace(tzinfo=timezone.utc)
+            return self.last_modified <= since
+
+        return False
+
+
+class SnapshotCache(OrderedDict):
+    """
+    Snapshots keyed by selection, the least recently used are evicted.
+    """
+
+    def __init__(self, *args: Any, maxsize: int = 16):
+        """
+        Initialize the cache.
+        :param maxsize: Maximum number of snapshots kept.
+        """
+        self.maxsize = maxsize
+        super().__init__(*args)
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """
+        Get a snapshot, marking it as recently used.
+        """
+        if key not in self:
+            return default
+        self.move_to_end(key)
+        return self[key]
+
+    def get_or_create(self, key: Hashable) -> CharacterSnapshot:
+        """
+        Get a snapshot, creating it and evicting the oldest if needed.
+        """
+        snapshot = self.get(key)
+        if snapshot is None:
+            snapshot = self[key] = CharacterSnapshot()
+            while len(self) > self.maxsize:
+                self.popitem(last=False)
+        return snapshot
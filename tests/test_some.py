@@ -1,10 +1,28 @@
+import asyncio
+import json
+import os
+import tempfile
+import threading
 import unittest
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
 from unittest.mock import AsyncMock, patch
 
+from fastapi import Response
+
+import main
+from api_helpers import scheduler
+from api_helpers.checkpoint import CrawlCheckpoint
 from api_helpers.fetcher import GraphFetcher
+from api_helpers.scheduler import Priority, PriorityScheduler, RequestClass
 from apis.api_aggregator import APIAggregator
 from apis.base_api import CharacterAPI
-from models.character import Character, OriginEnum
+from apis.swapi_api import SWAPI
+from benchmarks import microbench
+from benchmarks.microbench import compare, generate_payloads, run_suite
+from main import parse_sources, refresh_characters
+from models.character import Character, OriginEnum, parse_fields, project_characters
+from storage.snapshot import CharacterSnapshot, SnapshotCache
 
 
 class MockAPI(CharacterAPI):
@@ -133,3 +151,643 @@ class TestGraphFetcher(unittest.IsolatedAsyncioTestCase):
         self.assertIn("height", luke.additional_attributes)
         self.assertEqual(luke.additional_attributes["birth_year"], "19BBY")
         self.assertEqual(luke.additional_attributes["height"], "172")
+
+
+class TestPriorityScheduler(unittest.IsolatedAsyncioTestCase):
+    """
+    Unit tests for PriorityScheduler class.
+    """
+
+    async def _run_saturated(self, scheduler, requests):
+        order = []
+        await scheduler.acquire()
+
+        async def worker(label, priority, request_class):
+            await scheduler.acquire(priority, request_class)
+            order.append(label)
+            scheduler.release()
+
+        tasks = [asyncio.create_task(worker(*request)) for request in requests]
+        await asyncio.sleep(0)
+        scheduler.release()
+        await asyncio.gather(*tasks)
+        return order
+
+    async def test_pages_preempt_enrichment(self):
+        scheduler = PriorityScheduler(limit=1)
+        order = await self._run_saturated(
+            scheduler,
+            [
+                ("enrichment", Priority.ENRICHMENT, RequestClass.INTERACTIVE),
+                ("detail", Priority.DETAIL, RequestClass.INTERACTIVE),
+                ("page", Priority.PAGE, RequestClass.INTERACTIVE),
+            ],
+        )
+        self.assertEqual(order, ["page", "detail", "enrichment"])
+
+    async def test_interactive_preempts_background(self):
+        scheduler = PriorityScheduler(limit=1)
+        order = await self._run_saturated(
+            scheduler,
+            [
+                ("background", Priority.PAGE, RequestClass.BACKGROUND),
+                ("interactive", Priority.ENRICHMENT, RequestClass.INTERACTIVE),
+            ],
+        )
+        self.assertEqual(order, ["interactive", "background"])
+
+    async def test_aging_prevents_starvation(self):
+        scheduler = PriorityScheduler(limit=1, aging=0.01)
+        order = []
+        await scheduler.acquire()
+
+        async def worker(label, priority, request_class):
+            await scheduler.acquire(priority, request_class)
+            order.append(label)
+            scheduler.release()
+
+        # The lowest level waits past its level * aging deadline before a
+        # top priority request arrives, so it must go first
+        low = asyncio.create_task(
+            worker("enrichment", Priority.ENRICHMENT, RequestClass.BACKGROUND)
+        )
+        await asyncio.sleep(
+            PriorityScheduler.level(Priority.ENRICHMENT, RequestClass.BACKGROUND)
+            * scheduler.aging
+            + 0.02
+        )
+        high = asyncio.create_task(
+            worker("page", Priority.PAGE, RequestClass.INTERACTIVE)
+        )
+        await asyncio.sleep(0)
+        scheduler.release()
+        await asyncio.gather(low, high)
+
+        self.assertEqual(order, ["enrichment", "page"])
+
+    async def test_priority_wins_before_aging(self):
+        scheduler = PriorityScheduler(limit=1, aging=10)
+        order = await self._run_saturated(
+            scheduler,
+            [
+                ("enrichment", Priority.ENRICHMENT, RequestClass.BACKGROUND),
+                ("page", Priority.PAGE, RequestClass.INTERACTIVE),
+            ],
+        )
+        self.assertEqual(order, ["page", "enrichment"])
+
+    async def test_scheduler_is_shared_per_host(self):
+        swapi, other_swapi = SWAPI(), SWAPI()
+
+        self.assertIs(
+            swapi.fetcher.scheduler("https://swapi.dev/api/people/"),
+            other_swapi.fetcher.scheduler("https://swapi.dev/api/species/1/"),
+        )
+        self.assertIsNot(
+            swapi.fetcher.scheduler("https://swapi.dev/api/people/"),
+            swapi.fetcher.scheduler("https://pokeapi.co/api/v2/pokemon/"),
+        )
+
+    @patch("api_helpers.fetcher.GraphFetcher.safe_fetch_single", new_callable=AsyncMock)
+    async def test_enrichment_overlaps_pagination(self, mock_fetch):
+        responses = {
+            "https://swapi.dev/api/people/": {
+                "results": [{"species": ["https://swapi.dev/api/species/1/"]}],
+                "next": "https://swapi.dev/api/people/?page=2",
+            },
+            "https://swapi.dev/api/people/?page=2": {"results": [], "next": None},
+            "https://swapi.dev/api/species/1/": {"name": "Human"},
+        }
+        events = []
+
+        async def fetch(url):
+            events.append(("start", url))
+            await asyncio.sleep(0.01)
+            events.append(("end", url))
+            return responses[url]
+
+        mock_fetch.side_effect = fetch
+        await SWAPI().fetch_paginated_data("https://swapi.dev/api/people/")
+
+        self.assertLess(
+            events.index(("start", "https://swapi.dev/api/species/1/")),
+            events.index(("end", "https://swapi.dev/api/people/?page=2")),
+        )
+
+    @patch("api_helpers.fetcher.GraphFetcher.safe_fetch_single", new_callable=AsyncMock)
+    async def test_details_preempt_optional_enrichment(self, mock_fetch):
+        host = PriorityScheduler(limit=1)
+        order = []
+
+        async def fetch(url):
+            async with host:
+                order.append(url)
+            return {}
+
+        mock_fetch.side_effect = fetch
+        swapi = SWAPI()
+        item = {
+            "films": ["https://swapi.dev/api/films/1/"],
+            "species": ["https://swapi.dev/api/species/1/"],
+        }
+
+        await host.acquire()
+        task = asyncio.create_task(
+            swapi.fetcher.fetch_graph([item], swapi.detail_link_keys())
+        )
+        await asyncio.sleep(0.01)
+        host.release()
+        await task
+
+        self.assertEqual(
+            order,
+            ["https://swapi.dev/api/species/1/", "https://swapi.dev/api/films/1/"],
+        )
+
+    @patch("main.collect_characters", new_callable=AsyncMock)
+    async def test_refresh_runs_as_background(self, mock_collect):
+        request_classes = []
+
+        async def collect(*args):
+            request_classes.append(scheduler.current_request_class.get())
+            raise asyncio.CancelledError
+
+        mock_collect.side_effect = collect
+        with self.assertRaises(asyncio.CancelledError):
+            await refresh_characters(interval=60)
+
+        self.assertEqual(request_classes, [RequestClass.BACKGROUND])
+
+
+class TestNormalizeBatch(unittest.IsolatedAsyncioTestCase):
+    """
+    Unit tests for batch normalization.
+    """
+
+    raw_data = [
+        {"name": "Luke Skywalker", "species": ["https://swapi.dev/api/species/1/"]},
+        {"name": "Luke Skywalker", "species": []},
+        {"name": "R2-D2", "species": ["https://swapi.dev/api/species/2/"]},
+    ]
+    details_dict = {
+        "https://swapi.dev/api/species/1/": {"name": "Human"},
+        "https://swapi.dev/api/species/2/": {"name": "Droid"},
+    }
+
+    async def _normalize(self, swapi):
+        swapi.fetcher.details_dict = self.details_dict
+        return await swapi.normalize_data(self.raw_data)
+
+    async def test_normalize_data(self):
+        characters = await self._normalize(SWAPI())
+
+        self.assertEqual(
+            [char.name for char in characters], ["Luke Skywalker", "R2-D2"]
+        )
+        self.assertEqual(characters[0].species, "Human")
+        self.assertEqual(characters[1].origin, OriginEnum.STAR_WARS)
+
+    async def test_normalize_data_trusted(self):
+        swapi = SWAPI()
+        swapi.trusted = True
+        characters = await self._normalize(swapi)
+
+        self.assertEqual(characters, await self._normalize(SWAPI()))
+
+    @patch("apis.base_api.offload_threshold", 0)
+    async def test_normalize_data_in_executor(self):
+        swapi = SWAPI()
+        with ThreadPoolExecutor() as executor:
+            swapi.executor = executor
+            characters = await self._normalize(swapi)
+
+        self.assertEqual(characters, await self._normalize(SWAPI()))
+
+
+class TestCrawlCheckpoint(unittest.IsolatedAsyncioTestCase):
+    """
+    Unit tests for crawl checkpointing and resume.
+    """
+
+    responses = {
+        "https://swapi.dev/api/people/?page=2": {
+            "results": [
+                {"name": "R2-D2", "species": ["https://swapi.dev/api/species/2/"]}
+            ],
+            "next": None,
+        },
+        "https://swapi.dev/api/species/2/": {"name": "Droid"},
+    }
+
+    url = "https://swapi.dev/api/people/"
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        dir_patch = patch("api_helpers.checkpoint.checkpoint_dir", self.tmp_dir.name)
+        dir_patch.start()
+        self.addCleanup(dir_patch.stop)
+        self.path = os.path.join(
+            self.tmp_dir.name, f"{SWAPI().checkpoint_key(self.url)}.jsonl"
+        )
+        page = {
+            "page": [
+                {
+                    "name": "Luke Skywalker",
+                    "species": ["https://swapi.dev/api/species/1/"],
+                }
+            ],
+            "next_url": "https://swapi.dev/api/people/?page=2",
+        }
+        with open(self.path, "w") as file:
+            file.write(f"{json.dumps(page)}\n")
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    @patch("api_helpers.fetcher.GraphFetcher.safe_fetch_single", new_callable=AsyncMock)
+    async def test_resume_from_checkpoint(self, mock_fetch):
+        responses = {
+            **self.responses,
+            "https://swapi.dev/api/species/1/": {"name": "Human"},
+        }
+        mock_fetch.side_effect = lambda url: responses[url]
+        swapi = SWAPI()
+        swapi.API_URL = self.url
+
+        raw_data = await swapi.fetch_data()
+
+        fetched = sorted(call.args[0] for call in mock_fetch.call_args_list)
+        self.assertEqual(fetched, sorted(responses))
+        self.assertEqual(
+            [item["name"] for item in raw_data], ["Luke Skywalker", "R2-D2"]
+        )
+        self.assertEqual(
+            swapi.fetcher.details_dict["https://swapi.dev/api/species/1/"],
+            {"name": "Human"},
+        )
+        self.assertFalse(os.path.exists(self.path))
+
+    @patch("api_helpers.fetcher.GraphFetcher.safe_fetch_single", new_callable=AsyncMock)
+    async def test_checkpoint_is_saved_before_enrichment(self, mock_fetch):
+        mock_fetch.side_effect = lambda url: self.responses.get(url, {})
+        swapi = SWAPI()
+        swapi.API_URL = self.url
+        swapi.fetcher.fetch_graph = AsyncMock(side_effect=RuntimeError("crash"))
+
+        with self.assertRaises(RuntimeError):
+            await swapi.fetch_data()
+
+        records = CrawlCheckpoint(self.path).load()
+        self.assertIsNone(records[-1]["next_url"])
+        self.assertEqual(len([record for record in records if "page" in record]), 2)
+
+    @patch("api_helpers.fetcher.GraphFetcher.safe_fetch_single", new_callable=AsyncMock)
+    async def test_checkpoint_is_kept_if_pagination_fails(self, mock_fetch):
+        mock_fetch.side_effect = lambda url: {}
+        swapi = SWAPI()
+        swapi.API_URL = self.url
+
+        await swapi.fetch_data()
+
+        records = CrawlCheckpoint(self.path).load()
+        self.assertEqual(records[0]["next_url"], "https://swapi.dev/api/people/?page=2")
+        self.assertEqual(
+            records[1], {"detail": "https://swapi.dev/api/species/1/", "data": {}}
+        )
+
+    def test_checkpoint_is_keyed_per_crawl(self):
+        swapi = SWAPI()
+        projected = SWAPI()
+        projected.fields = parse_fields("additional_attributes.birth_year")
+
+        self.assertNotEqual(
+            swapi.checkpoint_key(self.url), projected.checkpoint_key(self.url)
+        )
+        self.assertNotEqual(
+            swapi.checkpoint_key(self.url), swapi.checkpoint_key(f"{self.url}?x")
+        )
+
+    def test_checkpoint_has_a_single_owner(self):
+        key = SWAPI().checkpoint_key(self.url)
+        checkpoint = CrawlCheckpoint.for_crawl(key)
+
+        self.assertIsNotNone(checkpoint)
+        self.assertIsNone(CrawlCheckpoint.for_crawl(key))
+        checkpoint.release()
+        second = CrawlCheckpoint.for_crawl(key)
+        self.assertIsNotNone(second)
+        second.release()
+
+    async def test_checkpoint_is_written_off_the_loop(self):
+        checkpoint = CrawlCheckpoint(self.path)
+        checkpoint.append({"detail": "https://a/", "data": {}})
+        threads = []
+        write = checkpoint._write
+
+        def record_write(records):
+            threads.append(threading.get_ident())
+            write(records)
+
+        with patch.object(checkpoint, "_write", side_effect=record_write):
+            await checkpoint.save()
+
+        self.assertEqual(len(threads), 1)
+        self.assertNotEqual(threads[0], threading.get_ident())
+        self.assertEqual(checkpoint.load()[-1], {"detail": "https://a/", "data": {}})
+
+    async def test_checkpoint_saves_only_new_records(self):
+        checkpoint = CrawlCheckpoint(self.path)
+        written = []
+        write = checkpoint._write
+
+        def record_write(records):
+            written.append(records)
+            write(records)
+
+        with patch.object(checkpoint, "_write", side_effect=record_write):
+            checkpoint.append({"detail": "https://a/", "data": {}})
+            await checkpoint.save()
+            await checkpoint.save()
+            checkpoint.append({"detail": "https://b/", "data": {}})
+            await checkpoint.save()
+
+        self.assertEqual(
+            written,
+            [
+                [{"detail": "https://a/", "data": {}}],
+                [{"detail": "https://b/", "data": {}}],
+            ],
+        )
+        self.assertEqual(len(checkpoint.load()), 3)
+
+    async def test_interrupted_write_is_truncated(self):
+        with open(self.path, "a") as file:
+            file.write('{"detail": "https://a/", "da')
+        checkpoint = CrawlCheckpoint(self.path)
+
+        self.assertEqual(len(checkpoint.load()), 1)
+        checkpoint.append({"detail": "https://b/", "data": {}})
+        await checkpoint.save()
+        self.assertEqual(checkpoint.load()[-1], {"detail": "https://b/", "data": {}})
+
+
+class TestCharacterSnapshot(unittest.TestCase):
+    """
+    Unit tests for CharacterSnapshot class.
+    """
+
+    luke = {"name": "Luke Skywalker", "species": "Human"}
+    r2d2 = {"name": "R2-D2", "species": "Droid"}
+
+    def test_etag_is_stable(self):
+        snapshot = CharacterSnapshot()
+        snapshot.update([self.luke, self.r2d2])
+        etag, version = snapshot.etag, snapshot.version
+
+        snapshot.update([dict(self.luke), dict(self.r2d2)])
+
+        self.assertEqual(snapshot.etag, etag)
+        self.assertEqual(snapshot.version, version)
+
+    def test_conditional_headers(self):
+        snapshot = CharacterSnapshot()
+        snapshot.update([self.luke])
+        headers = snapshot.headers()
+
+        self.assertTrue(snapshot.is_not_modified(headers["ETag"], None))
+        self.assertTrue(snapshot.is_not_modified(f'W/{headers["ETag"]}', None))
+        self.assertFalse(snapshot.is_not_modified('"stale"', headers["Last-Modified"]))
+        self.assertTrue(snapshot.is_not_modified(None, headers["Last-Modified"]))
+        self.assertFalse(
+            snapshot.is_not_modified(None, "Thu, 01 Jan 1970 00:00:01 GMT")
+        )
+        self.assertFalse(snapshot.is_not_modified(None, None))
+
+    def test_last_modified_increases_within_a_second(self):
+        snapshot = CharacterSnapshot()
+        snapshot.update([self.luke])
+        first = snapshot.headers()["Last-Modified"]
+        snapshot.update([self.r2d2])
+
+        self.assertGreater(
+            snapshot.last_modified, datetime.now(timezone.utc) - timedelta(seconds=2)
+        )
+        self.assertNotEqual(snapshot.headers()["Last-Modified"], first)
+        self.assertFalse(snapshot.is_not_modified(None, first))
+
+    def test_changed_since(self):
+        snapshot = CharacterSnapshot()
+        snapshot.update([self.luke, self.r2d2])
+        first = snapshot.token
+        snapshot.update([{**self.luke, "species": "Jedi"}, self.r2d2])
+
+        self.assertEqual(snapshot.version, 2)
+        self.assertEqual(len(snapshot.changed_since(f"{snapshot.epoch}.0")), 2)
+        self.assertEqual(snapshot.changed_since(first)[0]["species"], "Jedi")
+        self.assertEqual(snapshot.changed_since(snapshot.token), [])
+
+    def test_changed_since_unknown_token(self):
+        snapshot = CharacterSnapshot()
+        snapshot.update([self.luke])
+        restarted = CharacterSnapshot()
+        restarted.update([self.luke])
+
+        self.assertIsNone(restarted.changed_since(snapshot.token))
+        self.assertIsNone(snapshot.changed_since(f"{snapshot.epoch}.5"))
+        self.assertIsNone(snapshot.changed_since("5"))
+
+    def test_changed_since_removal(self):
+        snapshot = CharacterSnapshot()
+        snapshot.update([self.luke, self.r2d2])
+        first = snapshot.token
+        snapshot.update([self.luke])
+
+        self.assertIsNone(snapshot.changed_since(first))
+        self.assertEqual(snapshot.changed_since(snapshot.token), [])
+
+
+class TestSnapshotCache(unittest.TestCase):
+    """
+    Unit tests for SnapshotCache class.
+    """
+
+    def test_least_recently_used_is_evicted(self):
+        cache = SnapshotCache(maxsize=2)
+        first = cache.get_or_create("first")
+        cache.get_or_create("second")
+        self.assertIs(cache.get("first"), first)
+
+        cache.get_or_create("third")
+
+        self.assertEqual(list(cache), ["first", "third"])
+        self.assertIs(cache.get_or_create("first"), first)
+
+
+class TestConditionalPolls(unittest.IsolatedAsyncioTestCase):
+    """
+    Unit tests for serving conditional polls from the snapshot.
+    """
+
+    async def asyncSetUp(self):
+        self.snapshot = CharacterSnapshot()
+        self.snapshot.update([{"name": "Luke Skywalker"}])
+        key = main.selection_key(list(main.SOURCES), None)
+        snapshots_patch = patch.dict(main.snapshots, {key: self.snapshot})
+        snapshots_patch.start()
+        self.addCleanup(snapshots_patch.stop)
+
+    async def _get(self, **kwargs):
+        params = {
+            "since": None,
+            "sources": None,
+            "fields": None,
+            "if_none_match": None,
+            "if_modified_since": None,
+        }
+        return await main.get_characters(Response(), **{**params, **kwargs})
+
+    @patch("main.collect_characters", new_callable=AsyncMock)
+    async def test_fresh_snapshot_serves_conditional_polls(self, mock_collect):
+        response = await self._get(if_none_match=self.snapshot.headers()["ETag"])
+
+        self.assertEqual(response.status_code, 304)
+        mock_collect.assert_not_awaited()
+
+    @patch("main.snapshot_max_age", 0)
+    @patch("main.collect_characters", new_callable=AsyncMock)
+    async def test_stale_snapshot_is_refreshed(self, mock_collect):
+        mock_collect.return_value = self.snapshot
+        await self._get(if_none_match=self.snapshot.headers()["ETag"])
+
+        mock_collect.assert_awaited_once()
+
+    @patch("main.collect_characters", new_callable=AsyncMock)
+    async def test_unconditional_requests_crawl(self, mock_collect):
+        mock_collect.return_value = self.snapshot
+        characters = await self._get()
+
+        mock_collect.assert_awaited_once()
+        self.assertEqual(characters, [{"name": "Luke Skywalker"}])
+
+
+class TestSelection(unittest.IsolatedAsyncioTestCase):
+    """
+    Unit tests for source selection and field projection.
+    """
+
+    raw_data = [
+        {
+            "name": "Luke Skywalker",
+            "species": ["https://swapi.dev/api/species/1/"],
+            "homeworld": "https://swapi.dev/api/planets/1/",
+            "birth_year": "19BBY",
+        }
+    ]
+
+    def test_parse_sources(self):
+        self.assertEqual(parse_sources(None), ["pokeapi", "swapi", "rickandmorty"])
+        self.assertEqual(parse_sources("swapi, swapi"), ["swapi"])
+        with self.assertRaises(ValueError):
+            parse_sources("swapi,unknown")
+        with self.assertRaises(ValueError):
+            parse_sources(", ")
+
+    def test_parse_fields(self):
+        self.assertIsNone(parse_fields(""))
+        self.assertEqual(
+            parse_fields("species,additional_attributes.status"),
+            {"name", "species", "additional_attributes.status"},
+        )
+        with self.assertRaises(ValueError):
+            parse_fields("height")
+
+    def test_project_characters(self):
+        rows = [
+            {
+                "name": "Rick Sanchez",
+                "origin": OriginEnum.RICK_AND_MORTY,
+                "species": "Human",
+                "additional_attributes": {"status": "Alive", "gender": "Male"},
+            }
+        ]
+
+        self.assertEqual(
+            project_characters(rows, parse_fields("additional_attributes.status")),
+            [{"name": "Rick Sanchez", "additional_attributes": {"status": "Alive"}}],
+        )
+        self.assertEqual(project_characters(rows, None), rows)
+        self.assertEqual(
+            list(project_characters(rows, parse_fields("species,origin"))[0]),
+            ["name", "origin", "species"],
+        )
+
+    @patch("api_helpers.fetcher.GraphFetcher.safe_fetch_single", new_callable=AsyncMock)
+    async def test_only_requested_enrichment_is_fetched(self, mock_fetch):
+        mock_fetch.return_value = {"name": "Human"}
+        swapi = SWAPI()
+        swapi.fields = parse_fields("species")
+        await swapi.fetcher.fetch_graph(swapi.enrichment_roots(self.raw_data))
+
+        mock_fetch.assert_awaited_once_with("https://swapi.dev/api/species/1/")
+
+        swapi = SWAPI()
+        swapi.fields = parse_fields("additional_attributes.birth_year")
+        self.assertEqual(swapi.enrichment_roots(self.raw_data), [])
+
+
+class TestMicrobench(unittest.TestCase):
+    """
+    Unit tests for the microbenchmark suite.
+    """
+
+    def test_generate_payloads(self):
+        payloads = generate_payloads(200, dup_ratio=0.5)
+
+        self.assertEqual(payloads, generate_payloads(200, dup_ratio=0.5))
+        self.assertEqual(len(payloads["SWAPI"][0]), 200)
+        names = {item["name"] for item in payloads["SWAPI"][0]}
+        self.assertLess(len(names), 200)
+        self.assertIn(payloads["PokeAPI"][0][0]["url"], payloads["PokeAPI"][1])
+
+    def test_run_suite_and_compare(self):
+        results = {"50": run_suite(50, dup_ratio=0.1, repeat=1, min_time=0)}
+
+        self.assertIn("normalize_data[SWAPI]", results["50"])
+        self.assertIn("FileStorageManager.save", results["50"])
+        self.assertEqual(compare(results, results, threshold=0.2), [])
+
+        slower = {
+            "50": {
+                stage: {metric: value * 2 for metric, value in measurement.items()}
+                for stage, measurement in results["50"].items()
+            }
+        }
+        self.assertTrue(compare(slower, results, threshold=0.2))
+
+    def test_compare_refuses_other_parameters(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            baseline = os.path.join(tmp_dir, "baseline.json")
+            args = ["--sizes", "50", "--repeat", "1", "--min-time", "0"]
+            args += ["--baseline", baseline]
+
+            self.assertEqual(microbench.main([*args, "--save-baseline"]), 0)
+            with open(baseline) as file:
+                self.assertEqual(
+                    json.load(file)["params"], microbench.run_params(0.1, 1, 0)
+                )
+            self.assertEqual(
+                microbench.main([*args, "--compare", "--dup-ratio", "0.5"]), 2
+            )
+
+    def test_compare_refuses_missing_entries(self):
+        results = {"50": {"sort": {"seconds": 1.0, "peak_bytes": 1}}}
+
+        self.assertEqual(microbench.missing_entries(results, results), [])
+        self.assertEqual(
+            microbench.missing_entries(results, {"1000": results["50"]}),
+            ["size 50 is not in the baseline"],
+        )
+        self.assertEqual(
+            microbench.missing_entries(results, {"50": {}}),
+            ["sort @ 50 is not in the baseline"],
+        )